@@ -5,12 +5,32 @@ Application Launcher - Complete Windows application launching system
 
 import subprocess
 import os
+import sys
+import json
+import time
+import shutil
 import winreg
 from pathlib import Path
 import psutil
 from utils.logger import setup_logger
 
+# Command words stripped from voice commands before matching an app name
+APP_NAME_STOPWORDS = frozenset(["open", "launch", "start", "run", "execute", "the", "a", "an"])
+
+# Installed-app scan results are reused from disk for a day
+APPS_CACHE_TTL_SECONDS = 24 * 3600
+
+# Fire-and-forget launches: don't inherit our std streams
+_POPEN_KW = dict(stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                 stderr=subprocess.DEVNULL)
+
+# Console programs need real stdio, so they get their own window instead
+CONSOLE_APPS = frozenset(["cmd.exe", "powershell.exe"])
+
 class AppLauncher:
+    # Installed apps found by the first scan, shared by later instances
+    _installed_apps_cache = None
+    
     def __init__(self):
         self.logger = setup_logger()
         
@@ -55,6 +75,10 @@ class AppLauncher:
         
         # Cache for installed applications
         self.installed_apps = {}
+        self.apps_cache_file = Path("data") / "installed_apps.json"
+        
+        # Executables found under each install directory, listed on first lookup
+        self.executable_index = {}
         self.scan_installed_apps()
         
         print("Application Launcher initialized!")
@@ -93,9 +117,7 @@ class AppLauncher:
     
     def extract_app_name(self, command):
         """Extract application name from voice command"""
-        words_to_remove = ["open", "launch", "start", "run", "execute", "the", "a", "an"]
-        words = command.lower().split()
-        app_words = [word for word in words if word not in words_to_remove]
+        app_words = [word for word in command.lower().split() if word not in APP_NAME_STOPWORDS]
         return " ".join(app_words)
     
     def launch_system_app(self, app_name):
@@ -105,11 +127,13 @@ class AppLauncher:
             
             # Special handling for certain apps
             if app_name == "file explorer":
-                subprocess.Popen(["explorer.exe"])
+                subprocess.Popen(["explorer.exe"], **_POPEN_KW)
             elif app_name == "control panel":
-                subprocess.Popen(["control.exe"])
+                subprocess.Popen(["control.exe"], **_POPEN_KW)
+            elif app_executable in CONSOLE_APPS:
+                subprocess.Popen([app_executable], creationflags=subprocess.CREATE_NEW_CONSOLE)
             else:
-                subprocess.Popen(app_executable, shell=True)
+                subprocess.Popen(app_executable, shell=True, **_POPEN_KW)
             
             return f"Launching {app_name.title()}"
             
@@ -126,6 +150,11 @@ class AppLauncher:
             if app_name_lower in installed_name.lower():
                 return path
         
+        # Anything on PATH resolves with a few stats instead of a directory walk
+        on_path = shutil.which(app_name_lower)
+        if on_path:
+            return on_path
+        
         # Search in common installation directories
         search_paths = [
             "C:/Program Files",
@@ -144,32 +173,42 @@ class AppLauncher:
     
     def search_directory_for_app(self, directory, app_name):
         """Search directory for application executable"""
+        app_name_lower = app_name.lower()
+        for file_lower, path in self.get_directory_executables(directory):
+            if app_name_lower in file_lower:
+                return path
+        return None
+    
+    def get_directory_executables(self, directory):
+        """List the .exe files under a directory once, then serve lookups from memory"""
+        executables = self.executable_index.get(directory)
+        if executables is not None:
+            return executables
+        
+        executables = []
         try:
-            if not os.path.exists(directory):
-                return None
-            
             # Limit search depth for performance
             for root, dirs, files in os.walk(directory):
-                # Skip deep nested directories
+                # Don't descend past the depth limit at all
                 depth = root[len(directory):].count(os.sep)
-                if depth > 3:
-                    continue
+                if depth >= 3:
+                    dirs[:] = []
                 
                 for file in files:
-                    if file.lower().endswith('.exe'):
-                        if app_name.lower() in file.lower():
-                            return os.path.join(root, file)
-            
-            return None
+                    file_lower = file.lower()
+                    if file_lower.endswith('.exe'):
+                        executables.append((file_lower, os.path.join(root, file)))
             
         except Exception as e:
             self.logger.error(f"Directory search error: {e}")
-            return None
+        
+        self.executable_index[directory] = executables
+        return executables
     
     def launch_custom_app(self, app_path, app_name):
         """Launch custom/installed application"""
         try:
-            subprocess.Popen(app_path, shell=True)
+            subprocess.Popen(app_path, shell=True, **_POPEN_KW)
             return f"Launching {app_name.title()}"
             
         except Exception as e:
@@ -178,6 +217,20 @@ class AppLauncher:
     
     def scan_installed_apps(self):
         """Scan for installed applications in registry and common locations"""
+        if AppLauncher._installed_apps_cache is not None:
+            self.installed_apps = dict(AppLauncher._installed_apps_cache)
+            return
+        
+        if sys.platform != "win32":
+            return
+        
+        cached_apps = self.load_apps_cache()
+        if cached_apps is not None:
+            self.installed_apps = cached_apps
+            AppLauncher._installed_apps_cache = dict(cached_apps)
+            print(f"Found {len(self.installed_apps)} installed applications (cached)")
+            return
+        
         try:
             # Scan Windows Registry for installed programs
             self.scan_registry_apps()
@@ -185,11 +238,34 @@ class AppLauncher:
             # Scan desktop shortcuts
             self.scan_desktop_shortcuts()
             
+            AppLauncher._installed_apps_cache = dict(self.installed_apps)
+            self.save_apps_cache()
             print(f"Found {len(self.installed_apps)} installed applications")
             
         except Exception as e:
             self.logger.error(f"App scanning error: {e}")
     
+    def load_apps_cache(self):
+        """Load the last scan from disk, or None if it's missing or stale"""
+        try:
+            with open(self.apps_cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if time.time() - data.get('ts', 0) >= APPS_CACHE_TTL_SECONDS:
+            return None
+        return data.get('apps', {})
+    
+    def save_apps_cache(self):
+        """Persist the scan results so the next start skips the registry walk"""
+        try:
+            self.apps_cache_file.parent.mkdir(exist_ok=True)
+            with open(self.apps_cache_file, 'w', encoding='utf-8') as f:
+                json.dump({'ts': time.time(), 'apps': self.installed_apps}, f, indent=2, ensure_ascii=False)
+        except OSError as e:
+            self.logger.error(f"App cache save error: {e}")
+    
     def scan_registry_apps(self):
         """Scan Windows Registry for installed applications"""
         try:
@@ -273,7 +349,11 @@ class AppLauncher:
                 search_term = command.replace("open", "").replace("website", "").strip()
                 url = f"https://www.google.com/search?q={search_term.replace(' ', '+')}"
             
-            subprocess.Popen(f'start {url}', shell=True)
+            # Hand the URL straight to the shell association - no cmd.exe in between
+            try:
+                os.startfile(url)
+            except OSError:
+                subprocess.Popen(f'start "" "{url}"', shell=True, **_POPEN_KW)
             return f"Opening website in browser"
             
         except Exception as e:
@@ -3,15 +3,26 @@
 File Manager - Complete file operations with security and advanced features
 """
 
+import errno
 import os
-import shutil
-import glob
-import send2trash  # pip install send2trash
+import re
 from pathlib import Path
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from itertools import count
 from utils.logger import setup_logger
 
+SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+@lru_cache(maxsize=None)
+def extension_filter(extensions):
+    """Build (once per extension set) a filename check for a frozenset of '.ext' strings"""
+    def matches(name):
+        return os.path.splitext(name)[1].lower() in extensions
+    return matches
+
 class FileManager:
     def __init__(self):
         self.logger = setup_logger()
@@ -29,6 +40,39 @@ class FileManager:
             "Code": [".py", ".js", ".html", ".css", ".cpp", ".java", ".php"]
         }
         
+        # Search vocabulary, built once instead of on every find_files call
+        self.keyword_to_extension = {
+            'python': '.py',
+            'text': '.txt', 
+            'pdf': '.pdf',
+            'image': '.jpg',
+            'images': '.jpg',
+            'picture': '.jpg',
+            'pictures': '.jpg',
+            'photo': '.jpg',
+            'photos': '.jpg',
+            'music': '.mp3',
+            'song': '.mp3',
+            'songs': '.mp3',
+            'audio': '.mp3',
+            'video': '.mp4',
+            'videos': '.mp4',
+            'movie': '.mp4',
+            'movies': '.mp4',
+            'document': '.pdf',
+            'documents': '.pdf',
+            'word': '.docx',
+            'excel': '.xlsx',
+            'powerpoint': '.pptx',
+            'zip': '.zip',
+            'archive': '.zip'
+        }
+        self.search_stop_words = frozenset([
+            'could', 'you', 'help', 'me', 'to', 'find', 'search', 'for', 'file', 'files',
+            'by', 'extension', 'with', 'named', 'called'
+        ])
+        self.extension_pattern = re.compile(r'\.(\w+)')
+        
         # Script templates for automated file creation
         self.script_templates = {
             ".py": '''#!/usr/bin/env python3
@@ -210,20 +254,17 @@ What would you like to do?"""
             
             if confirm in ['yes', 'y']:
                 moved_count = 0
+                same_filesystem = self._same_filesystem(source_dir, destination_dir)
                 for file in matching_files:
                     try:
-                        destination_file = destination_dir / file.name
                         # Handle name conflicts
-                        counter = 1
-                        while destination_file.exists():
-                            name = file.stem + f"_{counter}" + file.suffix
-                            destination_file = destination_dir / name
-                            counter += 1
-                        
-                        shutil.move(str(file), str(destination_file))
-                        moved_count += 1
+                        destination_file = self._reserve_destination(destination_dir, file)
                     except Exception as e:
                         self.logger.error(f"Error moving {file}: {e}")
+                        continue
+                    
+                    if self._move_file(file, destination_file, same_filesystem):
+                        moved_count += 1
                 
                 return f"✅ Successfully moved {moved_count} files to {destination_dir}"
             else:
@@ -284,7 +325,7 @@ What would you like to do?"""
                 for file in matching_files:
                     try:
                         destination_file = destination_dir / file.name
-                        shutil.copy2(str(file), str(destination_file))
+                        self._copy_file(file, destination_file)
                         copied_count += 1
                     except Exception as e:
                         self.logger.error(f"Error copying {file}: {e}")
@@ -297,6 +338,29 @@ What would you like to do?"""
             self.logger.error(f"Copy files error: {e}")
             return f"❌ Error during file copy: {str(e)}"
     
+    def _copy_file(self, source, destination):
+        """Copy a file in-kernel where possible, keeping metadata like copy2"""
+        import shutil
+        
+        # Opening the destination for writing would truncate the source first
+        if os.path.exists(destination) and os.path.samefile(source, destination):
+            raise shutil.SameFileError(f"{source} and {destination} are the same file")
+        
+        if not hasattr(os, 'copy_file_range'):  # Windows / macOS
+            shutil.copy2(str(source), str(destination))
+            return
+        
+        try:
+            with open(source, 'rb') as src, open(destination, 'wb') as dst:
+                while os.copy_file_range(src.fileno(), dst.fileno(), 1 << 30):
+                    pass
+        except OSError:
+            # Cross-filesystem or unsupported - let shutil pick the copy strategy
+            shutil.copy2(str(source), str(destination))
+            return
+        
+        shutil.copystat(str(source), str(destination))
+    
     def create_script_interactive(self):
         """Interactive script creation with templates"""
         if not self.authenticate():
@@ -390,9 +454,24 @@ What would you like to do?"""
             if confirm in ['yes', 'y']:
                 deleted_count = 0
                 try:
-                    for file in matching_files:
-                        send2trash.send2trash(str(file))
-                        deleted_count += 1
+                    import send2trash  # pip install send2trash - only needed here
+                    
+                    try:
+                        # Trash the whole selection in one call
+                        send2trash.send2trash([str(file) for file in matching_files])
+                        deleted_count = len(matching_files)
+                    except OSError as e:
+                        # Batch failed part-way - retry file by file to count what went
+                        self.logger.error(f"Batch trash failed, retrying per file: {e}")
+                        for file in matching_files:
+                            if not file.exists():
+                                deleted_count += 1
+                                continue
+                            try:
+                                send2trash.send2trash(str(file))
+                                deleted_count += 1
+                            except OSError as file_error:
+                                self.logger.error(f"Error trashing {file}: {file_error}")
                     
                     return f"✅ Sent {deleted_count} files to recycle bin/trash"
                 except ImportError:
@@ -417,42 +496,11 @@ What would you like to do?"""
     def find_files(self, query):
         """Enhanced file finding with better natural language parsing"""
         try:
-            import re
-            
-            # Keyword to extension mapping
-            keyword_to_extension = {
-                'python': '.py',
-                'text': '.txt', 
-                'pdf': '.pdf',
-                'image': '.jpg',
-                'images': '.jpg',
-                'picture': '.jpg',
-                'pictures': '.jpg',
-                'photo': '.jpg',
-                'photos': '.jpg',
-                'music': '.mp3',
-                'song': '.mp3',
-                'songs': '.mp3',
-                'audio': '.mp3',
-                'video': '.mp4',
-                'videos': '.mp4',
-                'movie': '.mp4',
-                'movies': '.mp4',
-                'document': '.pdf',
-                'documents': '.pdf',
-                'word': '.docx',
-                'excel': '.xlsx',
-                'powerpoint': '.pptx',
-                'zip': '.zip',
-                'archive': '.zip'
-            }
-            
             # Clean the query
             query_lower = query.lower()
             
             # Method 1: Look for explicit extension (.py, .txt, etc.)
-            extension_pattern = r'\.(\w+)'
-            extension_match = re.search(extension_pattern, query)
+            extension_match = self.extension_pattern.search(query)
             
             if extension_match:
                 extension = '.' + extension_match.group(1).lower()
@@ -460,8 +508,8 @@ What would you like to do?"""
                 search_type = f"files with {extension} extension"
             
             # Method 2: Look for known keywords
-            elif any(keyword in query_lower for keyword in keyword_to_extension):
-                for keyword, ext in keyword_to_extension.items():
+            elif any(keyword in query_lower for keyword in self.keyword_to_extension):
+                for keyword, ext in self.keyword_to_extension.items():
                     if keyword in query_lower:
                         pattern = f"**/*{ext}"
                         search_type = f"{keyword} files ({ext})"
@@ -484,8 +532,7 @@ What would you like to do?"""
             # Method 4: Extract actual filename (improved logic)
             else:
                 # Remove common command words and extract meaningful terms
-                stop_words = ['could', 'you', 'help', 'me', 'to', 'find', 'search', 'for', 'file', 'files', 'by', 'extension', 'with', 'named', 'called']
-                words = [word for word in query_lower.split() if word not in stop_words and len(word) > 2]
+                words = [word for word in query_lower.split() if word not in self.search_stop_words and len(word) > 2]
                 
                 if words:
                     # Use the longest/most meaningful word
@@ -530,27 +577,38 @@ What would you like to do?"""
                 Path.home() / "Videos"
             ]
             
+            # Parse brace patterns like **/*.{jpg,png} once into an extension set
+            ext_set = None
+            if '{' in pattern:
+                extensions = pattern.split('{')[1].split('}')[0].split(',')
+                ext_set = frozenset('.' + ext.strip().lower() for ext in extensions)
+            
             found_files = []
+            seen = set()
             for search_path in search_paths:
+                if len(found_files) >= 20:  # Limit total results
+                    break
                 if search_path.exists():
                     try:
-                        if '{' in pattern:  # Multiple extensions
-                            # Handle multiple extensions pattern
-                            base_pattern = pattern.split('.{')[0] + '.'
-                            extensions = pattern.split('{')[1].split('}')[0].split(',')
-                            for ext in extensions:
-                                files = list(search_path.glob(f"{base_pattern}{ext}"))
-                                found_files.extend(files[:5])  # Limit per extension
+                        if ext_set:  # Multiple extensions - one walk for all of them
+                            files = self._scan_by_extension(search_path, ext_set)
                         else:
-                            files = list(search_path.glob(pattern))
-                            found_files.extend(files[:5])  # Limit results per directory
+                            files = search_path.glob(pattern)
+                        
+                        # Skip duplicates as they stream in, limit results per directory
+                        added = 0
+                        for file in files:
+                            if file in seen:
+                                continue
+                            seen.add(file)
+                            found_files.append(file)
+                            added += 1
+                            if added >= 5 or len(found_files) >= 20:
+                                break
                     except Exception as e:
                         self.logger.error(f"Error searching in {search_path}: {e}")
                         continue
             
-            # Remove duplicates and limit total results
-            found_files = list(dict.fromkeys(found_files))[:20]  # Remove duplicates, limit to 20
-            
             if found_files:
                 result = f"🔍 Found {len(found_files)} {search_type}:\n\n"
                 for i, file in enumerate(found_files[:15], 1):  # Show max 15
@@ -571,6 +629,22 @@ What would you like to do?"""
             self.logger.error(f"Enhanced file search error: {e}")
             return "❌ Error occurred while searching for files. Try being more specific with your search criteria."
 
+    def _scan_by_extension(self, root, ext_set):
+        """Recursively yield files under root whose extension is in ext_set"""
+        matches = extension_filter(ext_set)
+        pending = [root]
+        while pending:
+            directory = pending.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        # Dotfiles and dot-directories are included, matching Path.glob
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif matches(entry.name):
+                            yield Path(entry.path)
+            except OSError as e:
+                self.logger.error(f"Error scanning {directory}: {e}")
     
     def organize_downloads(self):
         """Organize files in Downloads folder by type"""
@@ -579,40 +653,56 @@ What would you like to do?"""
             if not downloads.exists():
                 return "Downloads folder not found."
             
-            moved_count = 0
             created_folders = []
-            
-            # Create category folders and move files
-            for category, extensions in self.file_categories.items():
-                category_folder = downloads / category
-                
-                # Find files of this category
-                category_files = []
-                for ext in extensions:
-                    category_files.extend(downloads.glob(f"*{ext}"))
-                
-                if category_files:
-                    # Create folder if it doesn't exist
-                    if not category_folder.exists():
-                        category_folder.mkdir()
-                        created_folders.append(category)
+            moves = []
+            # Placeholders reserved but not yet consumed by a move
+            unused_reservations = set()
+            
+            # List Downloads once and classify every category against it (dotfiles
+            # included, like the per-pattern glob this replaced)
+            with os.scandir(downloads) as entries:
+                download_files = [Path(entry.path) for entry in entries if entry.is_file()]
+            
+            def run_move(move):
+                moved = self._move_file(*move)
+                unused_reservations.discard(move[1])
+                return moved
+            
+            try:
+                # Create category folders and plan the moves
+                for category, extensions in self.file_categories.items():
+                    category_folder = downloads / category
                     
-                    # Move files
-                    for file in category_files:
-                        if file.is_file():
-                            try:
-                                destination = category_folder / file.name
-                                # Handle duplicate names
-                                counter = 1
-                                while destination.exists():
-                                    name = file.stem + f"_{counter}" + file.suffix
-                                    destination = category_folder / name
-                                    counter += 1
+                    # Find files of this category
+                    matches = extension_filter(frozenset(extensions))
+                    category_files = [file for file in download_files if matches(file.name)]
+                    
+                    if category_files:
+                        # Create folder if it doesn't exist
+                        if not category_folder.exists():
+                            category_folder.mkdir()
+                            created_folders.append(category)
+                        
+                        same_filesystem = self._same_filesystem(downloads, category_folder)
+                        for file in category_files:
+                            if file.is_file():
+                                try:
+                                    # Handle duplicate names, including ones planned in this batch
+                                    destination = self._reserve_destination(category_folder, file)
+                                except Exception as e:
+                                    self.logger.error(f"Error moving {file}: {e}")
+                                    continue
                                 
-                                shutil.move(str(file), str(destination))
-                                moved_count += 1
-                            except Exception as e:
-                                self.logger.error(f"Error moving {file}: {e}")
+                                unused_reservations.add(destination)
+                                moves.append((file, destination, same_filesystem))
+                
+                # Destinations are disjoint, so the moves can run side by side
+                with ThreadPoolExecutor(max_workers=4) as executor:
+                    moved_count = sum(executor.map(run_move, moves))
+            finally:
+                # Planning failed or was interrupted - don't leave empty files behind
+                for destination in unused_reservations:
+                    self._release_reservation(destination)
             
             result = f"Organization complete!\\n"
             result += f"- Moved {moved_count} files\\n"
@@ -624,6 +714,58 @@ What would you like to do?"""
             self.logger.error(f"File organization error: {e}")
             return "Error occurred while organizing files."
     
+    def _same_filesystem(self, source_dir, destination_dir):
+        """Check whether a move between two directories can be a plain rename"""
+        try:
+            return source_dir.stat().st_dev == destination_dir.stat().st_dev
+        except OSError:
+            return False
+    
+    def _reserve_destination(self, directory, file):
+        """Atomically claim a free name for file in directory, adding _N on conflicts"""
+        destination = directory / file.name
+        if file.is_dir():
+            # A placeholder file would block renaming a folder onto it - just probe the name
+            for counter in count(1):
+                if not os.path.lexists(destination):
+                    return destination
+                destination = directory / f"{file.name}_{counter}"
+        for counter in count(1):
+            try:
+                # O_EXCL creates a placeholder only if the name is free - no separate stat
+                os.close(os.open(destination, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+                return destination
+            except FileExistsError:
+                destination = directory / f"{file.stem}_{counter}{file.suffix}"
+    
+    def _move_file(self, source, destination, same_filesystem=False):
+        """Move a single file onto its reserved destination, returning True on success"""
+        try:
+            if same_filesystem:
+                try:
+                    # Plain rename - skips shutil.move's extra stat probing
+                    os.replace(source, destination)
+                    return True
+                except OSError as e:
+                    # st_dev can match across mount points that still refuse a rename
+                    if e.errno != errno.EXDEV:
+                        raise
+            import shutil
+            shutil.move(str(source), str(destination))
+            return True
+        except Exception as e:
+            self.logger.error(f"Error moving {source}: {e}")
+            self._release_reservation(destination)
+            return False
+    
+    def _release_reservation(self, destination):
+        """Drop an empty placeholder left by _reserve_destination"""
+        try:
+            if destination.is_file() and destination.stat().st_size == 0:
+                destination.unlink()
+        except OSError:
+            pass
+    
     def find_duplicates(self, directory=None):
         """Find duplicate files in directory"""
         try:
@@ -634,28 +776,35 @@ What would you like to do?"""
             if not directory.exists():
                 return f"Directory {directory} not found."
             
-            # Group files by size first (faster than hash)
+            # Group files by size first (faster than hash) - one scandir walk,
+            # sizes come from the directory entries instead of extra stat calls
             size_groups = {}
-            for file in directory.rglob("*"):
-                if file.is_file():
-                    size = file.stat().st_size
-                    if size not in size_groups:
-                        size_groups[size] = []
-                    size_groups[size].append(file)
+            pending = [directory]
+            while pending:
+                current = pending.pop()
+                try:
+                    with os.scandir(current) as entries:
+                        for entry in entries:
+                            if entry.is_dir(follow_symlinks=False):
+                                pending.append(entry.path)
+                            elif entry.is_file():
+                                size_groups.setdefault(entry.stat().st_size, []).append(Path(entry.path))
+                except OSError as e:
+                    self.logger.error(f"Error scanning {current}: {e}")
             
             # Find potential duplicates (same size)
             duplicates = []
             for size, files in size_groups.items():
                 if len(files) > 1 and size > 0:  # Skip empty files
-                    duplicates.extend(files[1:])  # Keep first, mark others as duplicates
+                    duplicates.extend((file, size) for file in files[1:])  # Keep first, mark others as duplicates
             
             if duplicates:
-                total_size = sum(f.stat().st_size for f in duplicates)
+                total_size = sum(size for _, size in duplicates)
                 result = f"Found {len(duplicates)} potential duplicate files:\\n"
                 result += f"Total space that could be saved: {self.format_size(total_size)}\\n\\n"
                 
-                for i, file in enumerate(duplicates[:10], 1):
-                    result += f"{i}. {file.name} ({self.get_file_size(file)})\\n"
+                for i, (file, size) in enumerate(duplicates[:10], 1):
+                    result += f"{i}. {file.name} ({self.format_size(size)})\\n"
                     result += f"   {file.parent}\\n"
                 
                 if len(duplicates) > 10:
@@ -705,11 +854,12 @@ What would you like to do?"""
     
     def format_size(self, size_bytes):
         """Format bytes to human readable format"""
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size_bytes < 1024.0:
-                return f"{size_bytes:.1f} {unit}"
-            size_bytes /= 1024.0
-        return f"{size_bytes:.1f} TB"
+        if size_bytes < 1024:
+            return f"{size_bytes:.1f} B"
+        # Each unit is 2**10 bigger, so the bit length of the whole part picks the unit
+        # directly (x < 1024**k exactly when int(x) < 1024**k, so floats work too)
+        unit_index = min((int(size_bytes).bit_length() - 1) // 10, len(SIZE_UNITS) - 1)
+        return f"{float(size_bytes) / (1 << (10 * unit_index)):.1f} {SIZE_UNITS[unit_index]}"
     
     def get_modification_date(self, file_path):
         """Get file modification date"""
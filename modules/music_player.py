@@ -5,14 +5,17 @@ Fixed Visual Music Player - Resolves threading and pygame issues
 
 import pygame
 import os
+import hashlib
 import subprocess
 import time
 import threading
+import queue
 import math
 import json
+import numpy as np
 import openai
+from collections import OrderedDict
 from pathlib import Path
-from urllib.parse import quote_plus
 from utils.logger import setup_logger
 
 # YT-DLP integration
@@ -22,8 +25,49 @@ try:
 except ImportError:
     YTDLP_AVAILABLE = False
 
+# Parses for common commands that never need a Groq round-trip
+PRESET_AI_PARSES = {
+    "pause": {"song": "", "artist": "", "action": "pause", "search_query": ""},
+    "pause music": {"song": "", "artist": "", "action": "pause", "search_query": ""},
+    "stop": {"song": "", "artist": "", "action": "stop", "search_query": ""},
+    "stop music": {"song": "", "artist": "", "action": "stop", "search_query": ""},
+    "resume": {"song": "", "artist": "", "action": "resume", "search_query": ""},
+    "resume music": {"song": "", "artist": "", "action": "resume", "search_query": ""},
+    "play music": {"song": "", "artist": "", "action": "play", "search_query": "popular music"},
+}
+AI_PARSE_CACHE_SIZE = 256
+
+# Command words stripped from basic (non-AI) song requests
+SONG_NAME_STOPWORDS = frozenset(["play", "music", "song", "some", "the", "a", "open", "start"])
+
+# Control words for basic parsing, in priority order
+MUSIC_CONTROL_ACTIONS = ("stop", "pause", "resume")
+
+# Downloaded songs kept on disk for repeat requests
+SONG_CACHE_MAX_ENTRIES = 32
+SONG_CACHE_TTL_SECONDS = 7 * 86400
+PARTIAL_DOWNLOAD_SUFFIXES = ('.part', '.ytdl', '.temp')
+DOWNLOAD_QUEUE_SIZE = 8
+
+# YouTube search results reused for repeat queries within a few minutes
+SEARCH_CACHE_SIZE = 256
+SEARCH_CACHE_TTL_SECONDS = 300
+
+# Particle pool - fixed-size arrays, a slot is alive while its life > 0
+PARTICLE_CAPACITY = 64
+PARTICLE_LIMIT = 50
+PARTICLE_MAX_LIFE = 120
+
+VISUALIZER_BARS = 24
+TEXT_CACHE_SIZE = 32
+
+# Mixer output format - opus decodes at 48 kHz, so this avoids resampling it.
+# 2048 frames (~43 ms) is plenty for music; drop to 1024 if latency ever matters
+MUSIC_SAMPLE_RATE = 48000
+MUSIC_BUFFER = 2048
+
 class MusicPlayer:
-    def __init__(self, width=500, height=350):
+    def __init__(self, width=500, height=350, mixer_buffer=MUSIC_BUFFER):
         self.logger = setup_logger()
         
         # Music state - initialize BEFORE pygame
@@ -43,6 +87,9 @@ class MusicPlayer:
         self.window_open = False
         self.running = False
         self.minimized = False
+        self.needs_redraw = True
+        self.text_cache = OrderedDict()
+        self.window_ready = threading.Event()
         
         # Colors - Enhanced Dark futuristic theme
         self.colors = {
@@ -62,31 +109,93 @@ class MusicPlayer:
         # Animation variables
         self.pulse_time = 0
         self.wave_offset = 0
-        self.particle_systems = []
+        self.particles = {
+            'x': np.zeros(PARTICLE_CAPACITY, dtype=np.float32),
+            'y': np.zeros(PARTICLE_CAPACITY, dtype=np.float32),
+            'vx': np.zeros(PARTICLE_CAPACITY, dtype=np.float32),
+            'vy': np.zeros(PARTICLE_CAPACITY, dtype=np.float32),
+            'size': np.zeros(PARTICLE_CAPACITY, dtype=np.float32),
+            'life': np.zeros(PARTICLE_CAPACITY, dtype=np.int32),
+            'color': np.zeros(PARTICLE_CAPACITY, dtype=np.int8),
+        }
+        self.particle_colors = [self.colors['accent'], self.colors['success'], self.colors['particle']]
+        self.rng = np.random.default_rng()
         self.glow_intensity = 0
         
+        # Visualizer bar directions, shared by every frame
+        self.bar_indices = np.arange(VISUALIZER_BARS)
+        bar_angles = self.bar_indices / VISUALIZER_BARS * 2 * math.pi
+        self.bar_cos = np.cos(bar_angles)
+        self.bar_sin = np.sin(bar_angles)
+        
+        # Wave line sample points, shared by every frame
+        self.wave_xs = np.arange(0, self.width, 10)
+        self.wave_rows = np.arange(8)[:, None]
+        self.wave_points = np.empty((8, len(self.wave_xs), 2), dtype=np.int32)
+        self.wave_points[:, :, 0] = self.wave_xs
+        
         # Create temp music folder
         self.temp_music_dir = Path("temp_music")
         self.temp_music_dir.mkdir(exist_ok=True)
         
+        # Persistent index of downloaded songs: normalized query -> file info
+        self.song_cache_file = self.temp_music_dir / "index.json"
+        self.song_cache_lock = threading.Lock()
+        self.song_cache_index = self.load_song_cache()
+        # Recency bumps are only persisted on the next insert/eviction or flush
+        self.song_cache_dirty = False
+        # Evicted while still playing - deleted by the next sweep after the track changes
+        self.evicted_stream_file = None
+        # Drop files left behind by failed plays or earlier runs
+        self.sweep_song_files()
+        
+        # Recent AI parses keyed by normalized command (LRU order)
+        self.ai_parse_cache = OrderedDict(PRESET_AI_PARSES)
+        self.ai_parse_lock = threading.Lock()
+        
+        # Recent YouTube search results: normalized query -> (monotonic time, result)
+        self.search_cache = OrderedDict()
+        self.search_cache_lock = threading.Lock()
+        
+        # Shared yt-dlp clients, created on first use (YoutubeDL isn't thread-safe)
+        self.ydl_search = None
+        self.ydl_download = None
+        self.ydl_search_lock = threading.Lock()
+        self.ydl_download_lock = threading.Lock()
+        
+        # Pending play requests, handled in order by one worker thread
+        self.download_queue = queue.Queue(maxsize=DOWNLOAD_QUEUE_SIZE)
+        self.download_worker = None
+        self.download_lock = threading.Lock()
+        # Bumped by every play request - older queued requests are dropped before playback
+        self.play_generation = 0
+        
+        # Requests waiting for an AI parse, handled off the caller's thread
+        self.request_queue = queue.Queue()
+        self.request_worker = None
+        
         # Initialize Groq BEFORE pygame
+        self.groq_client = None
+        self.groq_model = "llama-3.1-8b-instant"
         self.setup_groq()
         
-        # Initialize pygame mixer ONLY (no display yet)
-        try:
-            pygame.mixer.pre_init(frequency=22050, size=-16, channels=2, buffer=512)
-            pygame.mixer.init()
-            print("Audio system initialized!")
-        except Exception as e:
-            print(f"Audio init error: {e}")
+        # Audio device is opened lazily on first playback - pre_init only records
+        # the settings. A music player can absorb ~43ms of latency; a bigger buffer
+        # means fewer audio callbacks and no underruns while downloads/rendering load the CPU
+        pygame.mixer.pre_init(frequency=MUSIC_SAMPLE_RATE, size=-16, channels=2, buffer=mixer_buffer)
+        self.mixer_lock = threading.Lock()
         
         # UI Elements (will be created when window opens)
         self.buttons = {}
         
+        # Build the yt-dlp clients in the background so the first request doesn't wait
+        if YTDLP_AVAILABLE and os.getenv('MUSIC_WARM_YTDLP', '1') != '0':
+            threading.Thread(target=self.warm_youtube_clients, daemon=True).start()
+        
         print(" Music Player initialized!")
         if YTDLP_AVAILABLE:
             print("YT-DLP streaming enabled!")
-        if hasattr(self, 'groq_client') and self.groq_client:
+        if self.groq_client:
             print("Groq AI music processing enabled!")
     
     def setup_groq(self):
@@ -99,7 +208,6 @@ class MusicPlayer:
                     api_key=groq_api_key,
                     base_url="https://api.groq.com/openai/v1"
                 )
-                self.groq_model = "llama-3.1-8b-instant"
                 print("Groq AI connected!")
             except Exception as e:
                 self.logger.error(f"Groq setup error: {e}")
@@ -108,6 +216,23 @@ class MusicPlayer:
             self.groq_client = None
             print("GROQ_API_KEY not found. Using basic parsing.")
     
+    def ensure_mixer(self):
+        """Open the audio device on first use, returning True when it's ready"""
+        if pygame.mixer.get_init():
+            return True
+        
+        with self.mixer_lock:
+            if pygame.mixer.get_init():
+                return True
+            try:
+                pygame.mixer.init()
+                print("Audio system initialized!")
+                return True
+            except Exception as e:
+                print(f"Audio init error: {e}")
+                self.logger.error(f"Audio init error: {e}")
+                return False
+    
     def create_window(self):
         """Create the pygame window - MUST be called from main thread"""
         if self.window_open:
@@ -124,11 +249,24 @@ class MusicPlayer:
             self.font_medium = pygame.font.Font(None, 24)
             self.font_small = pygame.font.Font(None, 18)
             
+            # Pre-render text that never changes
+            self.text_surfaces = {
+                'title': self.font_medium.render("SPECTER MUSIC PLAYER", True, self.colors['accent']),
+                'no_song': self.font_large.render("No Song Playing", True, self.colors['text_dim']),
+                'minimized': self.font_medium.render("🎵 Minimized - Click to restore", True, self.colors['text']),
+            }
+            for label in ('PAUSE', '▶️ PLAY', 'STOP', 'MIN'):
+                self.text_surfaces[label] = self.font_small.render(label, True, self.colors['text'])
+            self.loading_frames = [self.font_medium.render("Loading" + "." * dots, True, self.colors['warning'])
+                                   for dots in range(4)]
+            
             # Create UI elements
             self.buttons = self.create_buttons()
+            self.background_surface = self.create_background_surface()
             
             self.window_open = True
             self.running = True
+            self.window_ready.set()
             
             print("Music player window created!")
             return True
@@ -138,6 +276,34 @@ class MusicPlayer:
             self.logger.error(f"Window creation error: {e}")
             return False
     
+    def render_text(self, font, text, color):
+        """Render dynamic text, reusing the surface while the text stays the same"""
+        key = (id(font), text, color)
+        surface = self.text_cache.get(key)
+        if surface is None:
+            surface = font.render(text, True, color)
+            self.text_cache[key] = surface
+            if len(self.text_cache) > TEXT_CACHE_SIZE:
+                self.text_cache.popitem(last=False)
+        else:
+            self.text_cache.move_to_end(key)
+        return surface
+    
+    def create_background_surface(self):
+        """Render the static gradient once so frames only need a blit"""
+        factor = np.arange(self.height) / self.height
+        bg = self.colors['bg']
+        column = np.stack([
+            np.minimum((bg[0] * (1 + factor * 0.3)).astype(np.int32), 30),
+            np.minimum((bg[1] * (1 + factor * 0.3)).astype(np.int32), 30),
+            np.minimum((bg[2] * (1 + factor * 0.5)).astype(np.int32), 50),
+        ], axis=-1).astype(np.uint8)
+        
+        # Build a 1-pixel-wide column (surfarray is indexed [x][y]) and let SDL stretch it
+        column_surface = pygame.Surface((1, self.height))
+        pygame.surfarray.blit_array(column_surface, column[None, :, :])
+        return pygame.transform.scale(column_surface, (self.width, self.height))
+    
     def create_buttons(self):
         """Create UI buttons"""
         button_width = 80
@@ -154,11 +320,26 @@ class MusicPlayer:
             'minimize': pygame.Rect(start_x + (button_width + spacing) * 2, start_y, button_width, button_height)
         }
     
+    def get_cached_ai_parse(self, normalized_input):
+        """Return a previous AI parse of a normalize_query'd command, or None"""
+        with self.ai_parse_lock:
+            cached = self.ai_parse_cache.get(normalized_input)
+            if cached is None:
+                return None
+            self.ai_parse_cache.move_to_end(normalized_input)
+            return dict(cached)
+    
     def process_music_request_with_ai(self, user_input):
         """Use Groq AI to process music requests"""
-        if not hasattr(self, 'groq_client') or not self.groq_client:
+        if not self.groq_client:
             return self.extract_song_name(user_input)
         
+        # Repeat commands parse the same way - skip the network round-trip
+        normalized_input = self.normalize_query(user_input)
+        cached = self.get_cached_ai_parse(normalized_input)
+        if cached is not None:
+            return cached
+        
         try:
             system_prompt = """Extract song and artist from music requests. Return JSON only:
             {"song": "song_name", "artist": "artist_name", "action": "play/pause/stop/resume", "search_query": "optimized_search"}
@@ -171,7 +352,7 @@ class MusicPlayer:
             response = self.groq_client.chat.completions.create(
                 messages=[
                     {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_input}
+                    {"role": "user", "content": normalized_input}
                 ],
                 model=self.groq_model,
                 max_tokens=200,
@@ -182,6 +363,10 @@ class MusicPlayer:
             
             try:
                 parsed = json.loads(ai_response)
+                with self.ai_parse_lock:
+                    self.ai_parse_cache[normalized_input] = dict(parsed)
+                    if len(self.ai_parse_cache) > AI_PARSE_CACHE_SIZE:
+                        self.ai_parse_cache.popitem(last=False)
                 return parsed
             except json.JSONDecodeError:
                 return {"action": "play", "search_query": self.extract_song_name(user_input)}
@@ -190,42 +375,44 @@ class MusicPlayer:
             self.logger.error(f"Groq processing error: {e}")
             return {"action": "play", "search_query": self.extract_song_name(user_input)}
     
-    def extract_song_name(self, command):
+    def extract_song_name(self, command, words=None):
         """Basic song name extraction"""
-        words_to_remove = ["play", "music", "song", "some", "the", "a", "open", "start"]
-        words = command.lower().split()
-        song_words = [word for word in words if word not in words_to_remove]
-        return " ".join(song_words) if song_words else "popular music"
+        if words is None:
+            words = command.lower().split()
+        return " ".join(word for word in words if word not in SONG_NAME_STOPWORDS) or "popular music"
     
     def handle_music_request(self, command):
-        """Handle music request - safe for any thread"""
+        """Handle music request - safe for any thread, never blocks on the network"""
         if not command:
             return "Please provide a music request!"
         
         print(f"🎵 Processing: {command}")
         
         # Process with AI or fallback
-        if hasattr(self, 'groq_client') and self.groq_client:
-            request_data = self.process_music_request_with_ai(command)
+        if self.groq_client:
+            request_data = self.get_cached_ai_parse(self.normalize_query(command))
+            if request_data is None:
+                # Groq round-trip - hand it to the worker so the caller stays responsive
+                self.loading = True
+                self.status_message = "Understanding request..."
+                self.start_request_worker()
+                self.request_queue.put(command)
+                return f"Working on '{command}'..."
+            
             action = request_data.get("action", "play")
             search_query = request_data.get("search_query", command)
             print(f"AI processed: {request_data}")
         else:
-            command_lower = command.lower()
-            if "stop" in command_lower:
-                action = "stop"
-                search_query = ""
-            elif "pause" in command_lower:
-                action = "pause"
-                search_query = ""
-            elif "resume" in command_lower:
-                action = "resume" 
-                search_query = ""
-            else:
-                action = "play"
-                search_query = self.extract_song_name(command)
+            # One split, then set lookups - the words are reused for the song name
+            words = command.lower().split()
+            word_set = set(words)
+            action = next((word for word in MUSIC_CONTROL_ACTIONS if word in word_set), "play")
+            search_query = self.extract_song_name(command, words) if action == "play" else ""
         
-        # Execute action
+        return self.execute_music_action(action, search_query)
+    
+    def execute_music_action(self, action, search_query):
+        """Run a parsed music action"""
         if action == "stop":
             return self.stop_music()
         elif action == "pause":
@@ -240,24 +427,116 @@ class MusicPlayer:
         
         return f"Processed: {action}"
     
+    def start_request_worker(self):
+        """Start the background thread that parses queued requests with AI"""
+        with self.ai_parse_lock:
+            if self.request_worker and self.request_worker.is_alive():
+                return
+            self.request_worker = threading.Thread(target=self._request_worker_thread, daemon=True)
+            self.request_worker.start()
+    
+    def _request_worker_thread(self):
+        """Parse queued requests with Groq and run them, one at a time"""
+        while True:
+            command = self.request_queue.get()
+            try:
+                request_data = self.process_music_request_with_ai(command)
+                print(f"AI processed: {request_data}")
+                
+                self.loading = False  # play_music_smart sets it again while downloading
+                result = self.execute_music_action(request_data.get("action", "play"),
+                                                   request_data.get("search_query", command))
+                print(f"🎵 {result}")
+                if self.status_message == "Understanding request...":
+                    self.status_message = result  # e.g. "Nothing to pause"
+            except Exception as e:
+                self.loading = False
+                self.status_message = f"Error: {str(e)[:30]}"
+                self.logger.error(f"Music request error: {e}")
+            finally:
+                self.request_queue.task_done()
+    
     def play_music_smart(self, song_name):
         """Start music download and playback"""
-        if not YTDLP_AVAILABLE:
+        # Previously downloaded copies replay without searching again
+        cached = self.get_cached_song(song_name)
+        if not cached and not YTDLP_AVAILABLE:
             return "YT-DLP not installed. Run: pip install yt-dlp"
         
+        # Cache hits go through the download worker too, so an older download
+        # can't finish later and replace the newer song
+        if not self.queue_download(song_name):
+            return "Too many songs queued - try again in a moment"
+        
+        if cached:
+            return f"Playing '{cached['title']}'"
+        
         self.loading = True
         self.status_message = f"Searching: {song_name}"
+        return f"Searching for '{song_name}'..."
+    
+    def play_cached_song(self, cached):
+        """Play a song cache entry, returning True on success"""
+        if not self.ensure_mixer():
+            return False
         
-        # Start download in background thread
-        download_thread = threading.Thread(target=self._download_and_play_thread, args=(song_name,))
-        download_thread.daemon = True
-        download_thread.start()
+        try:
+            pygame.mixer.music.load(cached['file'])
+            pygame.mixer.music.play()
+        except Exception as e:
+            self.logger.error(f"Cached song playback error: {e}")
+            return False
         
-        return f"Searching for '{song_name}'..."
+        self.current_stream_file = Path(cached['file'])
+        self.current_song = cached['title']
+        self.current_artist = cached.get('uploader', 'Unknown')
+        self.status_message = f"♪ Playing: {self.current_song[:40]}"
+        self.is_playing = True
+        self.is_paused = False
+        self.glow_intensity = 1.0
+        return True
+    
+    def queue_download(self, song_name):
+        """Queue a play request, returning False if the queue is full"""
+        with self.download_lock:
+            if not (self.download_worker and self.download_worker.is_alive()):
+                self.download_worker = threading.Thread(target=self._download_worker_thread, daemon=True)
+                self.download_worker.start()
+            
+            try:
+                self.download_queue.put_nowait((song_name, self.play_generation + 1))
+            except queue.Full:
+                return False
+            self.play_generation += 1
+            return True
+    
+    def is_stale_request(self, generation):
+        """True once a newer play request has been queued"""
+        return generation != self.play_generation
     
-    def _download_and_play_thread(self, song_name):
-        """Background download thread - does NOT touch pygame"""
+    def _download_worker_thread(self):
+        """Run queued downloads one at a time so they never race each other"""
+        while True:
+            song_name, generation = self.download_queue.get()
+            try:
+                if not self.is_stale_request(generation):
+                    self._download_and_play(song_name, generation)
+            except Exception as e:
+                self.logger.error(f"Download worker error: {e}")
+            finally:
+                self.download_queue.task_done()
+            
+            # Nothing is downloading now, so unlisted files are safe to delete
+            if self.evicted_stream_file and self.evicted_stream_file != self.current_stream_file:
+                self.sweep_song_files()
+    
+    def _download_and_play(self, song_name, generation):
+        """Search, download and play a song - runs on the download worker"""
         try:
+            cached = self.get_cached_song(song_name)
+            if cached and self.play_cached_song(cached):
+                return
+            
             print("Searching YouTube...")
             self.status_message = "Searching YouTube..."
             
@@ -270,9 +549,16 @@ class MusicPlayer:
             print(f"Downloading: {search_result['title']}")
             self.status_message = f"Downloading: {search_result['title'][:40]}..."
             
-            success = self.download_audio(search_result['url'], search_result['title'])
+            file_path = self.fetch_audio(search_result['url'], search_result['title'])
+            if file_path and self.is_stale_request(generation):
+                # A newer request is waiting - keep the download for later, don't play it
+                self.cache_song(song_name, file_path, search_result)
+                return
+            
+            success = bool(file_path) and self.play_stream_file(file_path)
             
             if success:
+                self.cache_song(song_name, self.current_stream_file, search_result)
                 self.current_song = search_result['title']
                 self.current_artist = search_result.get('uploader', 'Unknown')
                 self.status_message = f"♪ Playing: {self.current_song[:40]}"
@@ -291,22 +577,188 @@ class MusicPlayer:
         finally:
             self.loading = False
     
-    def search_youtube(self, query):
-        """Search YouTube"""
+    def normalize_query(self, query):
+        """Normalize a song query for cache lookups"""
+        return " ".join(query.lower().split())
+    
+    def load_song_cache(self):
+        """Load the downloaded-song index, dropping expired or missing files"""
         try:
-            ydl_opts = {
+            with open(self.song_cache_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        
+        now = time.time()
+        return {
+            query: entry for query, entry in index.items()
+            if now - entry.get('ts', 0) < SONG_CACHE_TTL_SECONDS and Path(entry.get('file', '')).is_file()
+        }
+    
+    def save_song_cache(self):
+        """Persist the downloaded-song index - call with song_cache_lock held"""
+        try:
+            with open(self.song_cache_file, 'w', encoding='utf-8') as f:
+                json.dump(self.song_cache_index, f, indent=2)
+            self.song_cache_dirty = False
+        except OSError as e:
+            self.logger.error(f"Song cache save error: {e}")
+    
+    def flush_song_cache(self):
+        """Write out recency changes that haven't been saved yet"""
+        with self.song_cache_lock:
+            if self.song_cache_dirty:
+                self.save_song_cache()
+    
+    def get_cached_song(self, query):
+        """Return the cache entry for a query if its file is still usable"""
+        key = self.normalize_query(query)
+        with self.song_cache_lock:
+            entry = self.song_cache_index.get(key)
+            if not entry:
+                return None
+            
+            if time.time() - entry['ts'] >= SONG_CACHE_TTL_SECONDS or not Path(entry['file']).is_file():
+                # load_song_cache drops such entries too, so the write can wait
+                self.song_cache_index.pop(key)
+                self.song_cache_dirty = True
+                return None
+            
+            entry['ts'] = time.time()  # Mark as recently used - no disk write on the lookup path
+            self.song_cache_dirty = True
+            return dict(entry)
+    
+    def cache_song(self, query, file_path, search_result):
+        """Record a downloaded song and evict the least recently used extras"""
+        with self.song_cache_lock:
+            self.song_cache_index[self.normalize_query(query)] = {
+                'file': str(file_path),
+                'title': search_result['title'],
+                'uploader': search_result.get('uploader', 'Unknown'),
+                'url': search_result['url'],
+                'ts': time.time(),
+            }
+            
+            while len(self.song_cache_index) > SONG_CACHE_MAX_ENTRIES:
+                oldest = min(self.song_cache_index, key=lambda q: self.song_cache_index[q]['ts'])
+                evicted = self.song_cache_index.pop(oldest)
+                # Another query may share the same file
+                if any(e['file'] == evicted['file'] for e in self.song_cache_index.values()):
+                    continue
+                if self.current_stream_file and Path(evicted['file']) == Path(self.current_stream_file):
+                    self.evicted_stream_file = Path(evicted['file'])
+                    continue
+                try:
+                    Path(evicted['file']).unlink()
+                except OSError:
+                    pass
+            
+            self.save_song_cache()
+    
+    def sweep_song_files(self):
+        """Delete temp_music files the song index doesn't list - only call while no download runs"""
+        with self.song_cache_lock:
+            keep = {Path(entry['file']).name for entry in self.song_cache_index.values()}
+        keep.add(self.song_cache_file.name)
+        if self.current_stream_file:
+            keep.add(Path(self.current_stream_file).name)
+        self.evicted_stream_file = None
+        
+        try:
+            with os.scandir(self.temp_music_dir) as entries:
+                stale = [entry.path for entry in entries if entry.is_file() and entry.name not in keep]
+        except OSError as e:
+            self.logger.error(f"Song file sweep error: {e}")
+            return
+        
+        for path in stale:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def get_youtube_searcher(self):
+        """Shared YoutubeDL for searches - extractor setup is paid once"""
+        if self.ydl_search is None:
+            self.ydl_search = YoutubeDL({
                 "quiet": True,
                 "no_warnings": True,
                 "default_search": "ytsearch1:",
-            }
-            
-            with YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(f"ytsearch1:{query}", download=False)
+                # Only read the results page - the download does the one full extraction
+                "extract_flat": "in_playlist",
+                "socket_timeout": 8,
+                "extractor_retries": 1,
+            })
+        return self.ydl_search
+    
+    def get_youtube_downloader(self):
+        """Shared YoutubeDL for downloads - outtmpl is set per download"""
+        if self.ydl_download is None:
+            self.ydl_download = YoutubeDL({
+                # Opus streams are only remuxed into .opus (no re-encode) and SDL_mixer plays them
+                'format': 'bestaudio[acodec=opus]/bestaudio/best',
+                'outtmpl': str(self.temp_music_dir / '%(id)s.%(ext)s'),
+                'postprocessors': [{
+                    'key': 'FFmpegExtractAudio',
+                    'preferredcodec': 'opus',
+                }],
+                'quiet': True,
+                'no_warnings': True,
+                'socket_timeout': 8,
+                'extractor_retries': 1,
+            })
+        return self.ydl_download
+    
+    def warm_youtube_clients(self):
+        """Create the shared yt-dlp clients and their YouTube extractors ahead of use"""
+        try:
+            # Holding the locks makes an early request wait for warmup instead of racing it
+            with self.ydl_search_lock:
+                self.get_youtube_searcher().get_info_extractor('YoutubeSearch')
+            with self.ydl_download_lock:
+                self.get_youtube_downloader().get_info_extractor('Youtube')
+        except Exception as e:
+            self.logger.error(f"yt-dlp warmup error: {e}")
+    
+    def close_youtube_clients(self):
+        """Close the shared YoutubeDL instances"""
+        with self.ydl_search_lock:
+            if self.ydl_search is not None:
+                self.ydl_search.close()
+                self.ydl_search = None
+        with self.ydl_download_lock:
+            if self.ydl_download is not None:
+                self.ydl_download.close()
+                self.ydl_download = None
+    
+    def search_youtube(self, query):
+        """Search YouTube, reusing results for recently repeated queries"""
+        key = self.normalize_query(query)
+        with self.search_cache_lock:
+            cached = self.search_cache.get(key)
+            if cached and time.monotonic() - cached[0] < SEARCH_CACHE_TTL_SECONDS:
+                self.search_cache.move_to_end(key)
+                return dict(cached[1])
+            self.search_cache.pop(key, None)
+        
+        result = self._search_youtube_uncached(query)
+        if result:
+            with self.search_cache_lock:
+                self.search_cache[key] = (time.monotonic(), dict(result))
+                if len(self.search_cache) > SEARCH_CACHE_SIZE:
+                    self.search_cache.popitem(last=False)
+        return result
+    
+    def _search_youtube_uncached(self, query):
+        """Run a YouTube search through yt-dlp"""
+        try:
+            with self.ydl_search_lock:
+                info = self.get_youtube_searcher().extract_info(f"ytsearch1:{query}", download=False)
                 
                 if info and 'entries' in info and len(info['entries']) > 0:
                     entry = info['entries'][0]
                     return {
-                        'url': entry.get('webpage_url', ''),
+                        'url': entry.get('webpage_url') or entry.get('url', ''),
                         'title': entry.get('title', 'Unknown'),
                         'duration': entry.get('duration', 0),
                         'uploader': entry.get('uploader', 'Unknown')
@@ -316,60 +768,77 @@ class MusicPlayer:
         
         return None
     
-    def download_audio(self, youtube_url, title):
-        """Download and play audio"""
+    def fetch_audio(self, youtube_url, title):
+        """Download audio into temp_music and return its path, or None"""
         try:
-            self.cleanup_stream_file()
-            
             # Create safe filename
-            import hashlib
             safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_'))[:50]
-            file_hash = hashlib.md5(youtube_url.encode()).hexdigest()[:8]
+            file_hash = hashlib.blake2b(youtube_url.encode(), digest_size=4).hexdigest()
             temp_filename = f"{safe_title}_{file_hash}"
             temp_filepath = self.temp_music_dir / temp_filename
             
             # Download
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'outtmpl': str(temp_filepath.with_suffix('.%(ext)s')),
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '128',
-                }],
-                'quiet': True,
-                'no_warnings': True,
-            }
-            
-            with YoutubeDL(ydl_opts) as ydl:
+            with self.ydl_download_lock:
+                ydl = self.get_youtube_downloader()
+                ydl.params['outtmpl']['default'] = str(temp_filepath.with_suffix('.%(ext)s'))
                 ydl.download([youtube_url])
             
-            # Find and play file
-            for ext in ['.mp3', '.m4a', '.webm', '.opus']:
-                potential_file = temp_filepath.with_suffix(ext)
-                if potential_file.exists():
-                    if ext != '.mp3':
-                        final_file = temp_filepath.with_suffix('.mp3')
-                        potential_file.rename(final_file)
-                        self.current_stream_file = final_file
-                    else:
-                        self.current_stream_file = potential_file
-                    
-                    # Play music
-                    pygame.mixer.music.load(str(self.current_stream_file))
-                    pygame.mixer.music.play()
-                    return True
+            # Find the file with one directory scan, whatever extension yt-dlp picked
+            prefix = temp_filename + "."
+            with os.scandir(self.temp_music_dir) as entries:
+                candidates = [Path(entry.path) for entry in entries
+                              if entry.name.startswith(prefix) and not entry.name.endswith(PARTIAL_DOWNLOAD_SUFFIXES)]
+            if not candidates:
+                return None
             
-            return False
+            # Prefer the extracted .opus when there is one
+            return min(candidates, key=lambda path: path.suffix != '.opus')
             
         except Exception as e:
             self.logger.error(f"Download error: {e}")
-            return False
+            return None
+    
+    def play_stream_file(self, file_path):
+        """Play a freshly downloaded file, returning True on success"""
+        try:
+            self.current_stream_file = file_path
+            
+            # Play music
+            if self.ensure_mixer():
+                try:
+                    pygame.mixer.music.load(str(self.current_stream_file))
+                except pygame.error as e:
+                    # Older SDL_mixer builds can't decode opus - transcode only then
+                    self.logger.error(f"Direct playback failed, transcoding to mp3: {e}")
+                    self.status_message = "Converting audio..."
+                    self.current_stream_file = self.transcode_to_mp3(self.current_stream_file)
+                    pygame.mixer.music.load(str(self.current_stream_file))
+                pygame.mixer.music.play()
+                return True
+            
+        except Exception as e:
+            self.logger.error(f"Download error: {e}")
+        
+        # The song never made it into the cache - don't leave its file behind
+        self.discard_stream_file()
+        return False
+    
+    def transcode_to_mp3(self, source):
+        """Convert a downloaded file to mp3 with ffmpeg, replacing the original"""
+        target = source.with_suffix('.mp3')
+        subprocess.run(
+            ['ffmpeg', '-y', '-loglevel', 'error', '-i', str(source), '-vn', '-b:a', '128k', str(target)],
+            check=True
+        )
+        source.unlink()
+        return target
     
     def stop_music(self):
         """Stop music"""
-        pygame.mixer.music.stop()
+        if pygame.mixer.get_init():
+            pygame.mixer.music.stop()
         self.cleanup_stream_file()
+        self.flush_song_cache()
         self.is_playing = False
         self.is_paused = False
         self.current_song = None
@@ -380,7 +849,7 @@ class MusicPlayer:
     
     def pause_music(self):
         """Pause music"""
-        if self.is_playing and not self.is_paused:
+        if self.is_playing and not self.is_paused and self.ensure_mixer():
             pygame.mixer.music.pause()
             self.is_paused = True
             self.status_message = "Paused"
@@ -389,7 +858,7 @@ class MusicPlayer:
     
     def resume_music(self):
         """Resume music"""
-        if self.is_paused:
+        if self.is_paused and self.ensure_mixer():
             pygame.mixer.music.unpause()
             self.is_paused = False
             self.status_message = f"♪ Playing: {self.current_song}" if self.current_song else "♪ Playing"
@@ -397,13 +866,23 @@ class MusicPlayer:
         return "Nothing to resume"
     
     def cleanup_stream_file(self):
-        """Clean up temp files"""
-        if self.current_stream_file and Path(self.current_stream_file).exists():
-            try:
-                Path(self.current_stream_file).unlink()
-                self.current_stream_file = None
-            except:
-                pass
+        """Release the current track - the file stays in the song cache"""
+        self.current_stream_file = None
+    
+    def discard_stream_file(self):
+        """Release the current track and delete its file unless the song cache lists it"""
+        file_path = self.current_stream_file
+        self.current_stream_file = None
+        if not file_path:
+            return
+        
+        with self.song_cache_lock:
+            if any(Path(entry['file']) == Path(file_path) for entry in self.song_cache_index.values()):
+                return
+        try:
+            Path(file_path).unlink()
+        except OSError:
+            pass
     
     def handle_events(self):
         """Handle pygame events - ONLY call from main thread"""
@@ -411,6 +890,9 @@ class MusicPlayer:
             return True
             
         for event in pygame.event.get():
+            if event.type != pygame.MOUSEMOTION:
+                self.needs_redraw = True  # Clicks, expose/focus changes, etc.
+            
             if event.type == pygame.QUIT:
                 self.running = False
                 return False
@@ -432,6 +914,16 @@ class MusicPlayer:
         
         return True
     
+    def is_animating(self):
+        """Check whether frames change on their own right now"""
+        return ((self.is_playing and not self.is_paused) or self.loading or self.glow_intensity > 0
+                or bool(np.any(self.particles['life'] > 0)))
+    
+    def get_display_state(self):
+        """Snapshot of the state shown on screen - background threads change it freely"""
+        return (self.current_song, self.current_artist, self.status_message,
+                self.is_playing, self.is_paused, self.loading, self.minimized)
+    
     def update_animations(self):
         """Update animations"""
         self.pulse_time += 0.08
@@ -443,54 +935,48 @@ class MusicPlayer:
         else:
             self.glow_intensity = max(0.0, self.glow_intensity - 0.05)
         
-        # Update particles
-        self.particle_systems = [p for p in self.particle_systems if p['life'] > 0]
-        for particle in self.particle_systems:
-            particle['x'] += particle['vx']
-            particle['y'] += particle['vy']
-            particle['life'] -= 1
-            particle['vy'] += 0.05
-            particle['vx'] *= 0.99
+        # Update live particles in place
+        p = self.particles
+        alive = p['life'] > 0
+        p['x'][alive] += p['vx'][alive]
+        p['y'][alive] += p['vy'][alive]
+        p['life'][alive] -= 1
+        p['vy'][alive] += 0.05
+        p['vx'][alive] *= 0.99
     
     def add_particles(self):
         """Add particle effects"""
-        if len(self.particle_systems) < 50:
-            import random
-            
-            for _ in range(2):
-                angle = random.uniform(0, 2 * math.pi)
-                radius = random.uniform(50, 150)
-                
-                self.particle_systems.append({
-                    'x': self.width // 2 + math.cos(angle) * radius,
-                    'y': self.height // 2 + math.sin(angle) * radius,
-                    'vx': random.uniform(-1, 1),
-                    'vy': random.uniform(-2, 0),
-                    'life': random.randint(60, 120),
-                    'max_life': 120,
-                    'size': random.uniform(1, 3),
-                    'color': random.choice([self.colors['accent'], self.colors['success'], self.colors['particle']])
-                })
+        p = self.particles
+        alive = p['life'] > 0
+        if np.count_nonzero(alive) >= PARTICLE_LIMIT:
+            return
+        
+        # Reuse up to 2 dead slots
+        slots = np.flatnonzero(~alive)[:2]
+        count = len(slots)
+        angle = self.rng.uniform(0, 2 * math.pi, count)
+        radius = self.rng.uniform(50, 150, count)
+        
+        p['x'][slots] = self.width // 2 + np.cos(angle) * radius
+        p['y'][slots] = self.height // 2 + np.sin(angle) * radius
+        p['vx'][slots] = self.rng.uniform(-1, 1, count)
+        p['vy'][slots] = self.rng.uniform(-2, 0, count)
+        p['life'][slots] = self.rng.integers(60, PARTICLE_MAX_LIFE, count, endpoint=True)
+        p['size'][slots] = self.rng.uniform(1, 3, count)
+        p['color'][slots] = self.rng.integers(0, len(self.particle_colors), count)
     
     def draw_background(self):
         """Draw background"""
-        # Gradient
-        for y in range(self.height):
-            color_factor = y / self.height
-            r = int(self.colors['bg'][0] * (1 + color_factor * 0.3))
-            g = int(self.colors['bg'][1] * (1 + color_factor * 0.3))
-            b = int(self.colors['bg'][2] * (1 + color_factor * 0.5))
-            pygame.draw.line(self.screen, (min(r, 30), min(g, 30), min(b, 50)), (0, y), (self.width, y))
-        
-        # Wave lines
-        for i in range(8):
-            points = []
-            for x in range(0, self.width, 10):
-                y = self.height // 2 + math.sin((x * 0.01) + self.wave_offset + i * 0.3) * (20 + i * 5)
-                points.append((x, int(y)))
-            
-            if len(points) > 1:
-                pygame.draw.lines(self.screen, self.colors['accent_dim'], False, points, 2)
+        # Gradient (pre-rendered in create_background_surface)
+        self.screen.blit(self.background_surface, (0, 0))
+        
+        # Wave lines - all 8 rows evaluated in one NumPy pass
+        if len(self.wave_xs) > 1:
+            self.wave_points[:, :, 1] = (self.height // 2 + np.sin(self.wave_xs * 0.01 + self.wave_offset + self.wave_rows * 0.3)
+                                         * (20 + self.wave_rows * 5))
+            draw_lines, screen, color = pygame.draw.lines, self.screen, self.colors['accent_dim']
+            for points in self.wave_points.tolist():
+                draw_lines(screen, color, False, points, 2)
     
     def draw_main_panel(self):
         """Draw main panel"""
@@ -510,36 +996,35 @@ class MusicPlayer:
         pygame.draw.rect(self.screen, self.colors['accent_dim'], panel_rect, 2, border_radius=15)
         
         # Title
-        title_surface = self.font_medium.render("SPECTER MUSIC PLAYER", True, self.colors['accent'])
+        title_surface = self.text_surfaces['title']
         title_rect = title_surface.get_rect(center=(self.width // 2, 45))
         self.screen.blit(title_surface, title_rect)
         
         # Song info
         if self.current_song:
             song_title = self.current_song[:50] + "..." if len(self.current_song) > 50 else self.current_song
-            song_surface = self.font_large.render(song_title, True, self.colors['text'])
+            song_surface = self.render_text(self.font_large, song_title, self.colors['text'])
             song_rect = song_surface.get_rect(center=(self.width // 2, 120))
             self.screen.blit(song_surface, song_rect)
             
             if self.current_artist:
-                artist_surface = self.font_medium.render(f"by {self.current_artist}", True, self.colors['text_dim'])
+                artist_surface = self.render_text(self.font_medium, f"by {self.current_artist}", self.colors['text_dim'])
                 artist_rect = artist_surface.get_rect(center=(self.width // 2, 150))
                 self.screen.blit(artist_surface, artist_rect)
         else:
-            no_song_surface = self.font_large.render("No Song Playing", True, self.colors['text_dim'])
+            no_song_surface = self.text_surfaces['no_song']
             no_song_rect = no_song_surface.get_rect(center=(self.width // 2, 120))
             self.screen.blit(no_song_surface, no_song_rect)
         
         # Status
         status_color = self.colors['success'] if self.is_playing else self.colors['text_dim']
-        status_surface = self.font_small.render(self.status_message, True, status_color)
+        status_surface = self.render_text(self.font_small, self.status_message, status_color)
         status_rect = status_surface.get_rect(center=(self.width // 2, 200))
         self.screen.blit(status_surface, status_rect)
         
         # Loading animation
         if self.loading:
-            loading_text = "Loading" + "." * ((int(self.pulse_time * 5) % 4))
-            loading_surface = self.font_medium.render(loading_text, True, self.colors['warning'])
+            loading_surface = self.loading_frames[int(self.pulse_time * 5) % 4]
             loading_rect = loading_surface.get_rect(center=(self.width // 2, 230))
             self.screen.blit(loading_surface, loading_rect)
     
@@ -548,40 +1033,45 @@ class MusicPlayer:
         if not (self.is_playing and not self.is_paused):
             return
         
-        import random
-        
         center_x, center_y = self.width // 2, 270
         radius = 60
-        num_bars = 24
-        
-        for i in range(num_bars):
-            angle = (i / num_bars) * 2 * math.pi
-            height = random.randint(5, 20) + int(8 * math.sin(self.pulse_time + i * 0.2))
-            
-            inner_x = center_x + math.cos(angle) * radius
-            inner_y = center_y + math.sin(angle) * radius
-            outer_x = center_x + math.cos(angle) * (radius + height)
-            outer_y = center_y + math.sin(angle) * (radius + height)
-            
-            intensity = height / 28.0
-            color = (
-                int(self.colors['accent'][0] * intensity),
-                int(self.colors['accent'][1] * intensity), 
-                int(255 * intensity)
-            )
-            
-            pygame.draw.line(self.screen, color, (int(inner_x), int(inner_y)), 
-                           (int(outer_x), int(outer_y)), 3)
+        
+        # One batched draw for every bar's jitter plus the smooth pulse
+        heights = (self.rng.integers(5, 20, VISUALIZER_BARS, endpoint=True)
+                   + (8 * np.sin(self.pulse_time + self.bar_indices * 0.2)).astype(np.int32))
+        
+        inner_xs = (center_x + self.bar_cos * radius).astype(np.int32)
+        inner_ys = (center_y + self.bar_sin * radius).astype(np.int32)
+        outer_xs = (center_x + self.bar_cos * (radius + heights)).astype(np.int32)
+        outer_ys = (center_y + self.bar_sin * (radius + heights)).astype(np.int32)
+        
+        # Short bars can go negative - keep the color channels in range
+        intensities = np.clip(heights / 28.0, 0.0, 1.0)
+        reds = (self.colors['accent'][0] * intensities).astype(np.int32)
+        greens = (self.colors['accent'][1] * intensities).astype(np.int32)
+        blues = (255 * intensities).astype(np.int32)
+        
+        draw_line, screen = pygame.draw.line, self.screen
+        for bar in zip(inner_xs.tolist(), inner_ys.tolist(), outer_xs.tolist(), outer_ys.tolist(),
+                       reds.tolist(), greens.tolist(), blues.tolist()):
+            inner_x, inner_y, outer_x, outer_y, r, g, b = bar
+            draw_line(screen, (r, g, b), (inner_x, inner_y), (outer_x, outer_y), 3)
     
     def draw_particles(self):
         """Draw particles"""
-        for particle in self.particle_systems:
-            if particle['life'] > 0:
-                age_factor = particle['life'] / particle.get('max_life', 120)
-                size = max(1, int(particle.get('size', 2) * age_factor))
-                
-                pygame.draw.circle(self.screen, particle['color'], 
-                                 (int(particle['x']), int(particle['y'])), size)
+        p = self.particles
+        alive = np.flatnonzero(p['life'] > 0)
+        if not len(alive):
+            return
+        
+        sizes = np.maximum(1, (p['size'][alive] * p['life'][alive] / PARTICLE_MAX_LIFE).astype(np.int32))
+        xs = p['x'][alive].astype(np.int32)
+        ys = p['y'][alive].astype(np.int32)
+        colors = p['color'][alive]
+        
+        draw_circle, screen, palette = pygame.draw.circle, self.screen, self.particle_colors
+        for x, y, size, color in zip(xs.tolist(), ys.tolist(), sizes.tolist(), colors.tolist()):
+            draw_circle(screen, palette[color], (x, y), size)
     
     def draw_buttons(self):
         """Draw control buttons"""
@@ -605,7 +1095,7 @@ class MusicPlayer:
             pygame.draw.rect(self.screen, button_color, rect, border_radius=8)
             pygame.draw.rect(self.screen, self.colors['accent_dim'], rect, 2, border_radius=8)
             
-            text_surface = self.font_small.render(button_texts[button_name], True, self.colors['text'])
+            text_surface = self.text_surfaces[button_texts[button_name]]
             text_rect = text_surface.get_rect(center=rect.center)
             self.screen.blit(text_surface, text_rect)
     
@@ -616,7 +1106,7 @@ class MusicPlayer:
             
         if self.minimized:
             self.screen.fill(self.colors['bg'])
-            minimized_text = self.font_medium.render("🎵 Minimized - Click to restore", True, self.colors['text'])
+            minimized_text = self.text_surfaces['minimized']
             text_rect = minimized_text.get_rect(center=(self.width // 2, self.height // 2))
             self.screen.blit(minimized_text, text_rect)
         else:
@@ -640,13 +1130,21 @@ class MusicPlayer:
         print("Try: player.handle_music_request('play your favorite song')")
         
         try:
+            last_state = None
             while self.running:
                 if not self.handle_events():
                     break
                 
-                self.update_animations()
-                self.draw_frame()
-                clock.tick(60)
+                # Only repaint when something on screen can have changed
+                state = self.get_display_state()
+                if self.needs_redraw or state != last_state or self.is_animating():
+                    self.update_animations()
+                    self.draw_frame()
+                    self.needs_redraw = False
+                    last_state = state
+                    clock.tick(60)
+                else:
+                    clock.tick(10)  # Idle - just keep polling events
                 
         except Exception as e:
             print(f"Runtime error: {e}")
@@ -654,9 +1152,13 @@ class MusicPlayer:
         finally:
             # Cleanup
             self.cleanup_stream_file()
+            self.flush_song_cache()
+            if YTDLP_AVAILABLE:
+                self.close_youtube_clients()
             if self.window_open:
                 pygame.quit()
                 self.window_open = False
+                self.window_ready.clear()
             print("Music player closed!")
 
 # Simple test function
@@ -669,7 +1171,7 @@ def test_music_player():
     
     # Test music request in background
     def test_request():
-        time.sleep(2)  # Wait for window to open
+        player.window_ready.wait(timeout=5)  # Returns as soon as the window is up
         print("Testing music request...")
         player.handle_music_request("play the summoning by sleep token")
     
@@ -6,9 +6,61 @@ Uses your existing Groq API to generate news summaries
 #news_fetcher.py
 import openai
 import os
-from datetime import datetime
+import string
+import time
+import threading
+from datetime import date, datetime
+from functools import lru_cache
 from utils.logger import setup_logger
 
+# How long generated news is reused before asking Groq again (seconds)
+HEADLINES_CACHE_TTL = 5 * 60
+CATEGORY_CACHE_TTL = 10 * 60
+SEARCH_CACHE_TTL = 15 * 60
+
+BREAKING_NEWS_RULE = "━" * 51
+
+# Query word -> news category, in matching priority order
+NEWS_CATEGORY_KEYWORDS = {
+    "technology": "technology",
+    "tech": "technology",
+    "business": "business",
+    "sports": "sports",
+    "health": "health",
+    "entertainment": "entertainment",
+    "celebrity": "entertainment",
+    "science": "science",
+    "politics": "politics",
+    "political": "politics",
+}
+
+# Filler words dropped when turning a query into a search topic
+TOPIC_STOPWORDS = frozenset(["news", "about", "tell", "me", "latest", "current", "get", "fetch", "find", "show"])
+
+# What each category prompt should focus on
+CATEGORY_PROMPTS = {
+    "technology": "latest tech developments, AI breakthroughs, new gadgets, software updates, cybersecurity, and tech company news",
+    "business": "market movements, company earnings, economic indicators, mergers, startup funding, and industry trends",
+    "sports": "game results, player transfers, tournament updates, records broken, and sports business news",
+    "health": "medical breakthroughs, public health updates, new treatments, health research, and wellness trends",
+    "entertainment": "movie releases, celebrity news, music industry, streaming updates, and entertainment business",
+    "science": "research discoveries, space exploration, climate science, new studies, and scientific innovations",
+    "politics": "government updates, policy changes, elections, political developments, and international relations"
+}
+
+# Strips punctuation so "tech?" still matches "tech"
+QUERY_PUNCTUATION_TABLE = str.maketrans("", "", string.punctuation)
+
+@lru_cache(maxsize=1)
+def format_news_date(day):
+    """Long-form date for news headers - formatted once per day"""
+    return day.strftime("%B %d, %Y")
+
+@lru_cache(maxsize=256)
+def extract_news_topic(query):
+    """Strip filler words from a query - memoized since voice queries repeat"""
+    return " ".join(word for word in query.split() if word.lower() not in TOPIC_STOPWORDS) or "general"
+
 class NewsFetcher:
     def __init__(self):
         self.logger = setup_logger()
@@ -28,6 +80,10 @@ class NewsFetcher:
             self.model_name = None
             print("❌ GROQ_API_KEY not found. Add it to your .env file.")
         
+        # Generated results keyed by (kind, category/topic) -> (expires_at, text)
+        self.news_cache = {}
+        self.news_cache_lock = threading.Lock()
+        
     def get_news(self, query):
         """Main news fetching function using Groq AI"""
         if not self.openai_client:
@@ -35,42 +91,61 @@ class NewsFetcher:
         
         query = query.lower()
         
+        if "refresh" in query:
+            self.clear_news_cache()
+            query = query.replace("refresh", "")
+        
         try:
             if "headlines" in query or "top news" in query or query.strip() == "news":
                 return self.get_top_headlines()
-            elif "technology" in query or "tech" in query:
-                return self.get_category_news("technology")
-            elif "business" in query:
-                return self.get_category_news("business")
-            elif "sports" in query:
-                return self.get_category_news("sports")
-            elif "health" in query:
-                return self.get_category_news("health")
-            elif "entertainment" in query or "celebrity" in query:
-                return self.get_category_news("entertainment")
-            elif "science" in query:
-                return self.get_category_news("science")
-            elif "politics" in query or "political" in query:
-                return self.get_category_news("politics")
-            else:
-                # Extract topic from query
-                topic = self.extract_topic(query)
-                return self.search_news(topic)
+            
+            # Tokenize once, then one set lookup per category keyword
+            words = set(query.translate(QUERY_PUNCTUATION_TABLE).split())
+            categories = list(dict.fromkeys(cat for word, cat in NEWS_CATEGORY_KEYWORDS.items() if word in words))
+            if len(categories) > 1:
+                return self.get_briefing(categories)
+            if categories:
+                return self.get_category_news(categories[0])
+            
+            # Extract topic from query
+            topic = self.extract_topic(query)
+            return self.search_news(topic)
                 
         except Exception as e:
             self.logger.error(f"News generation error: {e}")
             return "Sorry, I couldn't generate the news right now. Please try again."
     
+    def get_cached_news(self, key):
+        """Return cached news text for a key if it hasn't expired"""
+        with self.news_cache_lock:
+            entry = self.news_cache.get(key)
+            if entry and time.monotonic() < entry[0]:
+                return entry[1]
+            self.news_cache.pop(key, None)
+        return None
+    
+    def cache_news(self, key, text, ttl):
+        """Remember generated news text for ttl seconds"""
+        with self.news_cache_lock:
+            self.news_cache[key] = (time.monotonic() + ttl, text)
+    
+    def clear_news_cache(self):
+        """Drop all cached news so the next request is freshly generated"""
+        with self.news_cache_lock:
+            self.news_cache.clear()
+    
     def extract_topic(self, query):
         """Extract news topic from query"""
-        words_to_remove = ["news", "about", "tell", "me", "latest", "current", "get", "fetch", "find", "show"]
-        words = query.split()
-        topic_words = [word for word in words if word.lower() not in words_to_remove]
-        return " ".join(topic_words) if topic_words else "general"
+        return extract_news_topic(query)
     
     def get_top_headlines(self):
         """Generate top headlines using Groq"""
-        current_date = datetime.now().strftime("%B %d, %Y")
+        cache_key = ("headlines", None)
+        cached = self.get_cached_news(cache_key)
+        if cached:
+            return cached
+        
+        current_date = format_news_date(date.today())
         
         prompt = f"Generate 8 realistic top news headlines for {current_date}. Include diverse topics: politics, technology, business, health, sports, entertainment, science, and world news. Format each headline as: 1. [Headline Title] 📍 [News Source] | 🕒 [Time like '2h ago'] Make headlines current, realistic, and varied. Don't include controversial or false information."
         
@@ -85,9 +160,10 @@ class NewsFetcher:
                 temperature=0.7
             )
             
-            result = f"📰 **Top Headlines** - {current_date}\n\n"
-            result += response.choices[0].message.content.strip()
+            content = response.choices[0].message.content.strip()
+            result = f"📰 **Top Headlines** - {current_date}\n\n{content}"
             
+            self.cache_news(cache_key, result, HEADLINES_CACHE_TTL)
             return result
             
         except Exception as e:
@@ -96,19 +172,14 @@ class NewsFetcher:
     
     def get_category_news(self, category):
         """Generate category-specific news using Groq"""
-        current_date = datetime.now().strftime("%B %d, %Y")
+        cache_key = ("category", category)
+        cached = self.get_cached_news(cache_key)
+        if cached:
+            return cached
         
-        category_prompts = {
-            "technology": "latest tech developments, AI breakthroughs, new gadgets, software updates, cybersecurity, and tech company news",
-            "business": "market movements, company earnings, economic indicators, mergers, startup funding, and industry trends",
-            "sports": "game results, player transfers, tournament updates, records broken, and sports business news",
-            "health": "medical breakthroughs, public health updates, new treatments, health research, and wellness trends",
-            "entertainment": "movie releases, celebrity news, music industry, streaming updates, and entertainment business",
-            "science": "research discoveries, space exploration, climate science, new studies, and scientific innovations",
-            "politics": "government updates, policy changes, elections, political developments, and international relations"
-        }
+        current_date = format_news_date(date.today())
         
-        category_focus = category_prompts.get(category, "general news and current events")
+        category_focus = CATEGORY_PROMPTS.get(category, "general news and current events")
         
         prompt = f"Generate 6 realistic {category} news articles for {current_date}. Focus on: {category_focus}. Format each article as: **[Number]. [Headline]** *[News Source]* [Brief 2-sentence summary] Make articles current, informative, and realistic. Don't include false information."
         
@@ -123,18 +194,58 @@ class NewsFetcher:
                 temperature=0.7
             )
             
-            result = f"📱 **{category.title()} News** - {current_date}\n\n"
-            result += response.choices[0].message.content.strip()
+            content = response.choices[0].message.content.strip()
+            result = f"📱 **{category.title()} News** - {current_date}\n\n{content}"
             
+            self.cache_news(cache_key, result, CATEGORY_CACHE_TTL)
             return result
             
         except Exception as e:
             self.logger.error(f"Category news error: {e}")
             return f"Error generating {category} news. Please try again."
     
+    def get_briefing(self, categories):
+        """Generate news for several categories with a single Groq request"""
+        cache_key = ("briefing", tuple(categories))
+        cached = self.get_cached_news(cache_key)
+        if cached:
+            return cached
+        
+        current_date = format_news_date(date.today())
+        category_list = ", ".join(categories)
+        category_focus = "\n".join(f"- {category}: {CATEGORY_PROMPTS.get(category, 'general news')}" for category in categories)
+        
+        prompt = f"Generate realistic news for {current_date} in each of these categories: {category_list}. For each category write a heading line '### [Category]' followed by 3 articles formatted as: **[Number]. [Headline]** *[News Source]* [Brief 2-sentence summary] Make articles current, informative, and realistic. Don't include false information. Focus for each category:\n{category_focus}"
+        
+        try:
+            response = self.openai_client.chat.completions.create(
+                messages=[
+                    {"role": "system", "content": "You are a news editor covering several beats. Generate realistic, current news articles."},
+                    {"role": "user", "content": prompt}
+                ],
+                model=self.model_name,
+                max_tokens=min(300 * len(categories), 1500),
+                temperature=0.7
+            )
+            
+            content = response.choices[0].message.content.strip()
+            result = f"🗞️ **News Briefing: {category_list.title()}** - {current_date}\n\n{content}"
+            
+            self.cache_news(cache_key, result, CATEGORY_CACHE_TTL)
+            return result
+            
+        except Exception as e:
+            self.logger.error(f"Briefing news error: {e}")
+            return f"Error generating news for {category_list}. Please try again."
+    
     def search_news(self, topic):
         """Search for news on specific topic using Groq"""
-        current_date = datetime.now().strftime("%B %d, %Y")
+        cache_key = ("search", topic.lower())
+        cached = self.get_cached_news(cache_key)
+        if cached:
+            return cached
+        
+        current_date = format_news_date(date.today())
         
         prompt = f"Generate 5 realistic news articles about '{topic}' for {current_date}. Format each article as: **[Number]. [Headline about {topic}]** *[News Source]* • [Time like '1h ago'] [Brief 2-sentence summary explaining the {topic} development] Make articles current, relevant to {topic}, and realistic. Don't include false information."
         
@@ -149,9 +260,10 @@ class NewsFetcher:
                 temperature=0.7
             )
             
-            result = f"🔍 **News about '{topic}'** - {current_date}\n\n"
-            result += response.choices[0].message.content.strip()
+            content = response.choices[0].message.content.strip()
+            result = f"🔍 **News about '{topic}'** - {current_date}\n\n{content}"
             
+            self.cache_news(cache_key, result, SEARCH_CACHE_TTL)
             return result
             
         except Exception as e:
@@ -160,8 +272,9 @@ class NewsFetcher:
     
     def get_breaking_news(self):
         """Generate breaking news alerts using Groq"""
-        current_date = datetime.now().strftime("%B %d, %Y")
-        current_time = datetime.now().strftime("%I:%M %p")
+        now = datetime.now()
+        current_date = format_news_date(now.date())
+        current_time = now.strftime("%I:%M %p")
         
         prompt = f"Generate 3-4 realistic breaking news alerts for {current_date} at {current_time}. Focus on urgent, developing stories across different categories. Format as: 🚨 **BREAKING**: [Headline] *[Source]* • [Time] [Brief urgent summary] Make it realistic and current."
         
@@ -176,11 +289,8 @@ class NewsFetcher:
                 temperature=0.8
             )
             
-            result = f"🚨 **BREAKING NEWS** - {current_date} {current_time}\n"
-            result += "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
-            result += response.choices[0].message.content.strip()
-            
-            return result
+            content = response.choices[0].message.content.strip()
+            return f"🚨 **BREAKING NEWS** - {current_date} {current_time}\n{BREAKING_NEWS_RULE}\n\n{content}"
             
         except Exception as e:
             self.logger.error(f"Breaking news error: {e}")
@@ -194,5 +304,5 @@ class NewsFetcher:
             "model": self.model_name if self.openai_client else "None",
             "api_key_set": os.getenv('GROQ_API_KEY') is not None,
             "categories": ["headlines", "technology", "business", "sports", "health", "entertainment", "science", "politics"],
-            "features": ["search", "breaking_news", "category_news", "top_headlines"]
+            "features": ["search", "breaking_news", "category_news", "top_headlines", "briefing"]
         }
\ No newline at end of file
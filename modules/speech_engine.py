@@ -10,8 +10,24 @@ import threading
 import queue
 import time
 import os
+import re
 from utils.logger import setup_logger
 
+# Local speech recognition (optional) - avoids the Google round-trip per phrase
+try:
+    import numpy as np
+    from faster_whisper import WhisperModel
+    WHISPER_AVAILABLE = True
+except ImportError:
+    WHISPER_AVAILABLE = False
+
+# int8 weights keep the model small and fast on CPU; set WHISPER_MODEL= to disable
+WHISPER_MODEL_SIZE = os.getenv('WHISPER_MODEL', 'small.en')
+
+# Whisper punctuates ("Yes.", "Hey, Specter") - drop punctuation at word edges
+# but keep it inside words so "3:30" and "what's" survive
+WHISPER_PUNCTUATION = re.compile(r"(?<!\w)[^\w\s]+|[^\w\s]+(?!\w)")
+
 
 class ThreadSafeTTS:
     """Thread-safe Text-to-Speech manager to prevent conflicts"""
@@ -101,6 +117,7 @@ class SpeechEngine:
         self.recognizer = None
         self.microphone = None
         self.tts_manager = None
+        self.whisper_model = None
         self.status = {}
         
         print("🎤 Initializing Speech Engine...")
@@ -130,6 +147,7 @@ class SpeechEngine:
                 self.microphone = sr.Microphone()
                 self.status['microphone'] = 'Available'
                 print("✅ Microphone detected and initialized")
+                self._setup_local_recognition()
             else:
                 self.status['microphone'] = 'Not found'
                 print("❌ No microphone detected")
@@ -139,6 +157,21 @@ class SpeechEngine:
             self.status['microphone'] = f'Error: {str(e)}'
             print(f"❌ Speech recognition setup failed: {e}")
     
+    def _setup_local_recognition(self):
+        """Load the local Whisper model up front so the first phrase doesn't wait for it"""
+        self.status['stt_backend'] = 'Google'
+        if not WHISPER_AVAILABLE or not WHISPER_MODEL_SIZE:
+            return
+        
+        try:
+            self.whisper_model = WhisperModel(WHISPER_MODEL_SIZE, device="cpu", compute_type="int8")
+            self.status['stt_backend'] = f'Whisper {WHISPER_MODEL_SIZE} (local)'
+            print(f"✅ Local speech recognition loaded ({WHISPER_MODEL_SIZE})")
+        except Exception as e:
+            self.logger.error(f"Whisper model load error: {e}")
+            self.whisper_model = None
+            print(f"⚠️ Local speech recognition unavailable, using Google: {e}")
+    
     def _setup_text_to_speech(self):
         """Initialize text-to-speech system"""
         try:
@@ -176,6 +209,7 @@ class SpeechEngine:
         print("🎤 SPEECH ENGINE STATUS")
         print("="*50)
         print(f"🎧 Speech Recognition: {self.status.get('microphone', 'Unknown')}")
+        print(f"🧠 Recognizer: {self.status.get('stt_backend', 'None')}")
         print(f"🔊 Text-to-Speech: {self.status.get('tts', 'Disabled')}")
         print(f"🔧 Calibration: {self.status.get('calibration', 'Skipped')}")
         print(f"🎙️ TTS Enabled: {'Yes' if self.tts_enabled else 'No'}")
@@ -200,7 +234,7 @@ class SpeechEngine:
                 audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_limit)
             
             print("🔄 Processing speech...")
-            text = self.recognizer.recognize_google(audio)
+            text = self.transcribe(audio)
             print(f"📝 You said: '{text}'")
             return text.lower().strip()
             
@@ -218,6 +252,26 @@ class SpeechEngine:
             print(f"❌ Listen error: {e}")
             return ""
     
+    def transcribe(self, audio):
+        """Turn captured audio into text - local Whisper first, Google as fallback"""
+        if self.whisper_model:
+            try:
+                # Whisper wants 16 kHz mono float32 in [-1, 1]
+                pcm = audio.get_raw_data(convert_rate=16000, convert_width=2)
+                samples = np.frombuffer(pcm, np.int16).astype(np.float32) / 32768.0
+                segments, _ = self.whisper_model.transcribe(samples, beam_size=1, vad_filter=True)
+                text = " ".join(segment.text for segment in segments)
+                text = " ".join(WHISPER_PUNCTUATION.sub(" ", text).split())
+                if not text:
+                    raise sr.UnknownValueError()
+                return text
+            except sr.UnknownValueError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Whisper transcription error, falling back to Google: {e}")
+        
+        return self.recognizer.recognize_google(audio)
+    
     def speak(self, text):
         """Convert text to speech"""
         if not text or not text.strip():
@@ -263,6 +317,7 @@ class SpeechEngine:
             "speech_recognition_available": self.microphone is not None,
             "tts_available": self.tts_manager is not None,
             "tts_enabled": self.tts_enabled,
+            "local_stt": self.whisper_model is not None,
             "initialization_status": self.status
         }
     
@@ -306,24 +361,54 @@ class SpeechEngine:
         print(f"💡 Wake word: '{wake_word}'")
         print("💡 Press Ctrl+C to stop")
         
+        wake_word = wake_word.lower()
+        detections = queue.Queue()
+        
+        def on_phrase(recognizer, audio):
+            """Runs on the background listener thread for every captured phrase"""
+            try:
+                heard = self.transcribe(audio).lower()
+            except (sr.UnknownValueError, sr.RequestError):
+                return
+            except Exception as e:
+                self.logger.error(f"Wake word check error: {e}")
+                return
+            if wake_word in heard:
+                detections.put(heard)
+        
+        # The mic stays open and silence never reaches the recognizer -
+        # only phrases above the energy threshold are transcribed
+        stop_listening = self.recognizer.listen_in_background(self.microphone, on_phrase, phrase_time_limit=5)
+        
         try:
             while True:
-                command = self.listen(timeout=timeout_duration, phrase_limit=5)
+                try:
+                    detections.get(timeout=timeout_duration)
+                except queue.Empty:
+                    continue
                 
-                if wake_word.lower() in command:
-                    print(f"🎯 Wake word detected!")
-                    self.speak("Yes, I'm listening")
-                    
-                    # Get the actual command
-                    user_command = self.listen(timeout=10, phrase_limit=20)
-                    if user_command:
-                        callback(user_command)
+                print(f"🎯 Wake word detected!")
+                # Release the mic so the command can be captured in full
+                stop_listening(wait_for_stop=True)
+                self.speak("Yes, I'm listening")
+                
+                # Get the actual command
+                user_command = self.listen(timeout=10, phrase_limit=20)
+                if user_command:
+                    callback(user_command)
+                
+                # Drop wake words heard before the command, then resume
+                while not detections.empty():
+                    detections.get_nowait()
+                stop_listening = self.recognizer.listen_in_background(self.microphone, on_phrase, phrase_time_limit=5)
                     
         except KeyboardInterrupt:
             print("\n🛑 Continuous listening stopped")
         except Exception as e:
             self.logger.error(f"Continuous listen error: {e}")
             print(f"❌ Continuous listening error: {e}")
+        finally:
+            stop_listening(wait_for_stop=False)
     
     def shutdown(self):
         """Clean shutdown of speech engine"""
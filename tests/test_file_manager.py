@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+File manager tests
+"""
+
+import errno
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Add project root to path (file_manager imports utils.logger)
+sys.path.append(str(Path(__file__).parent.parent))
+
+from modules.file_manager import FileManager
+
+class TestFileManagerCopy(unittest.TestCase):
+    """Copy helper tests"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.file_manager = FileManager()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_copy_onto_itself_keeps_content(self):
+        """Copying a file onto itself must not truncate it"""
+        source = self.temp_dir / "notes.txt"
+        source.write_text("important data")
+
+        with self.assertRaises(shutil.SameFileError):
+            self.file_manager._copy_file(source, self.temp_dir / "notes.txt")
+
+        self.assertEqual(source.read_text(), "important data")
+
+    def test_copy_to_new_file(self):
+        """Copying to a new path duplicates the content"""
+        source = self.temp_dir / "notes.txt"
+        source.write_text("important data")
+        destination = self.temp_dir / "copy.txt"
+
+        self.file_manager._copy_file(source, destination)
+
+        self.assertEqual(destination.read_text(), "important data")
+        self.assertEqual(source.read_text(), "important data")
+
+class TestFileManagerFormatSize(unittest.TestCase):
+    """Size formatting tests"""
+
+    def test_format_size_units(self):
+        """Integer and float byte counts format like the original unit loop"""
+        file_manager = FileManager()
+        self.assertEqual(file_manager.format_size(0), "0.0 B")
+        self.assertEqual(file_manager.format_size(1023), "1023.0 B")
+        self.assertEqual(file_manager.format_size(1024), "1.0 KB")
+        self.assertEqual(file_manager.format_size(1536.5), "1.5 KB")
+        self.assertEqual(file_manager.format_size(1023.99), "1024.0 B")
+        self.assertEqual(file_manager.format_size(5 * 1024 ** 3), "5.0 GB")
+        self.assertEqual(file_manager.format_size(2048 * 1024 ** 4), "2048.0 TB")
+
+class TestFileManagerOrganize(unittest.TestCase):
+    """Downloads organizer tests"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.downloads = self.temp_dir / "Downloads"
+        self.downloads.mkdir()
+        (self.downloads / "report.pdf").write_text("pdf")
+        (self.downloads / "photo.jpg").write_text("jpg")
+        self.file_manager = FileManager()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_organize_moves_files(self):
+        """Files end up in their category folders"""
+        with mock.patch.object(Path, "home", return_value=self.temp_dir):
+            self.file_manager.organize_downloads()
+
+        self.assertEqual((self.downloads / "Documents" / "report.pdf").read_text(), "pdf")
+        self.assertEqual((self.downloads / "Images" / "photo.jpg").read_text(), "jpg")
+
+    def test_organize_includes_dotfiles(self):
+        """Hidden files are organized like any other file"""
+        (self.downloads / ".notes.txt").write_text("txt")
+
+        with mock.patch.object(Path, "home", return_value=self.temp_dir):
+            self.file_manager.organize_downloads()
+
+        self.assertEqual((self.downloads / "Documents" / ".notes.txt").read_text(), "txt")
+
+    def test_failed_planning_leaves_no_placeholders(self):
+        """Reserved names are released when planning stops partway"""
+        with mock.patch.object(Path, "home", return_value=self.temp_dir), \
+             mock.patch.object(FileManager, "_same_filesystem", side_effect=[True, OSError("boom")]):
+            self.file_manager.organize_downloads()
+
+        placeholders = [path for path in self.downloads.rglob("*") if path.is_file() and path.stat().st_size == 0]
+        self.assertEqual(placeholders, [])
+        self.assertTrue((self.downloads / "report.pdf").exists())
+        self.assertTrue((self.downloads / "photo.jpg").exists())
+
+class TestFileManagerMove(unittest.TestCase):
+    """Interactive mover tests"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.downloads = self.temp_dir / "Downloads"
+        self.downloads.mkdir()
+        self.file_manager = FileManager()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_move_folder_with_name_conflict(self):
+        """Folders move whole and get a _N suffix when the name is taken"""
+        (self.downloads / "project").mkdir()
+        (self.downloads / "project" / "main.py").write_text("code")
+        (self.temp_dir / "Archive" / "project").mkdir(parents=True)
+
+        with mock.patch.object(Path, "home", return_value=self.temp_dir), \
+             mock.patch.object(FileManager, "authenticate", return_value=True), \
+             mock.patch("builtins.input", side_effect=["project", "Archive", "y"]):
+            result = self.file_manager.move_files_interactive("move files")
+
+        self.assertIn("moved 1 files", result)
+        self.assertEqual((self.temp_dir / "Archive" / "project_1" / "main.py").read_text(), "code")
+        self.assertEqual(list((self.temp_dir / "Archive" / "project").iterdir()), [])
+        self.assertFalse((self.downloads / "project").exists())
+
+    def test_cross_device_rename_falls_back_to_copy(self):
+        """An EXDEV rename is retried with shutil.move"""
+        source = self.downloads / "clip.mp4"
+        source.write_text("video")
+        destination = self.temp_dir / "clip.mp4"
+
+        with mock.patch("os.replace", side_effect=OSError(errno.EXDEV, "Invalid cross-device link")):
+            moved = self.file_manager._move_file(source, destination, same_filesystem=True)
+
+        self.assertTrue(moved)
+        self.assertEqual(destination.read_text(), "video")
+        self.assertFalse(source.exists())
+
+class TestFileManagerScan(unittest.TestCase):
+    """Extension scan tests"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.file_manager = FileManager()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_scan_includes_hidden_entries_like_glob(self):
+        """The brace-pattern walker finds the same files as rglob"""
+        (self.temp_dir / ".hidden").mkdir()
+        (self.temp_dir / ".hidden" / "a.jpg").write_text("")
+        (self.temp_dir / ".b.png").write_text("")
+        (self.temp_dir / "c.jpg").write_text("")
+        (self.temp_dir / "d.txt").write_text("")
+
+        scanned = set(self.file_manager._scan_by_extension(self.temp_dir, frozenset({".jpg", ".png"})))
+        globbed = set(self.temp_dir.rglob("*.jpg")) | set(self.temp_dir.rglob("*.png"))
+
+        self.assertEqual(scanned, globbed)
+        self.assertEqual(len(scanned), 3)
+
+if __name__ == "__main__":
+    unittest.main()